@@ -1,14 +1,28 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import JSON, DateTime, Integer, case, cast, exists, extract, false, func, insert, lambda_stmt, literal, literal_column, null, select, union_all, update
+from sqlalchemy.orm import Session, aliased, selectinload
 import models
 import schemas
-from auth import hash_password
+from database import IS_SQLITE
+from auth import hash_password, hash_pool
 from datetime import datetime
+from typing import List, Optional
 import time
-import secrets
+import os
+import uuid
+
+# Per-session user cache - lives in db.info so it goes away with the session
+def _user_cache(db: Session, key: str):
+    return db.info.setdefault(key, {})
+
+def _cache_user(db: Session, user):
+    _user_cache(db, "user_cache_email")[user.email] = user
+    _user_cache(db, "user_cache_id")[user.id] = user
 
 # User operations
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = hash_password(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    # Callers on the async path hash in auth.hash_pool and pass the result in
+    if hashed_password is None:
+        hashed_password = hash_password(user.password)
     new_user = models.User(
         name=user.name,
         email=user.email,
@@ -16,134 +30,292 @@ def create_user(db: Session, user: schemas.UserCreate):
     )
     db.add(new_user)
     db.commit()
-    db.refresh(new_user)
+    # Replace any stale cache entry for this email with the new row
+    _cache_user(db, new_user)
     return new_user
 
+def create_users_bulk(db: Session, users: List[schemas.UserCreate]):
+    """Insert many users in one executemany round-trip; returns the row count"""
+    # Argon2 releases the GIL, so the hashing pool works through these in parallel
+    hashed_passwords = list(hash_pool.map(hash_password, [user.password for user in users]))
+    
+    rows = [
+        {"name": user.name, "email": user.email, "password": hashed}
+        for user, hashed in zip(users, hashed_passwords)
+    ]
+    if rows:
+        db.execute(insert(models.User), rows)
+        db.commit()
+    return len(rows)
+
+# Listings stream rows in batches instead of loading the whole table
+STREAM_BATCH_SIZE = 500
+
 def get_users(db: Session):
-    return db.query(models.User).all()
+    return db.query(models.User).yield_per(STREAM_BATCH_SIZE)
 
 def get_user_by_email(db: Session, email: str):
-    return db.query(models.User).filter(models.User.email == email).first()
+    email = schemas.normalize_email(email)
+    cache = _user_cache(db, "user_cache_email")
+    if email in cache:
+        return cache[email]
+    user = db.query(models.User).filter(models.User.email == email).first()
+    if user:
+        _cache_user(db, user)
+    return user
+
+def email_exists(db: Session, email: str):
+    """Index-only EXISTS check, for callers that don't need the user row"""
+    email = schemas.normalize_email(email)
+    return db.execute(select(exists().where(models.User.email == email))).scalar()
 
 def get_user_by_id(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    cache = _user_cache(db, "user_cache_id")
+    if user_id in cache:
+        return cache[user_id]
+    # Session.get checks the identity map before issuing a SELECT
+    user = db.get(models.User, user_id)
+    if user:
+        _cache_user(db, user)
+    return user
 
 # NEW: Get user ID from email (helper function)
+def update_user_password(db: Session, user_id: int, hashed_password: str):
+    db.execute(
+        update(models.User).where(models.User.id == user_id).values(password=hashed_password)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+# Process-wide email -> id cache. A user's id and email never change and
+# users aren't deleted, so entries can't go stale across requests or workers
+USER_ID_CACHE_TTL = 300
+USER_ID_CACHE_MAX = 10000
+_user_ids = {}
+
 def get_user_id_from_email(db: Session, email: str):
-    user = get_user_by_email(db, email)
-    return user.id if user else None
+    email = schemas.normalize_email(email)
+    cached = _user_ids.get(email)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+    user = _user_cache(db, "user_cache_email").get(email)
+    user_id = user.id if user else db.execute(
+        lambda_stmt(lambda: select(models.User.id).where(models.User.email == email))
+    ).scalar()
+    if user_id is not None:
+        if len(_user_ids) >= USER_ID_CACHE_MAX:
+            _user_ids.clear()
+        _user_ids[email] = (user_id, time.monotonic() + USER_ID_CACHE_TTL)
+    return user_id
 
 # Skill operations (UPDATED to use email)
 def add_skill_offer_by_email(db: Session, email: str, skill: schemas.SkillOfferCreate):
-    user = get_user_by_email(db, email)
-    if not user:
+    user_id = get_user_id_from_email(db, email)
+    if user_id is None:
         return None
     
     new_skill = models.UserSkill(
-        user_id=user.id,
+        user_id=user_id,
         skill_name=skill.skill_name,
-        skill_level=skill.skill_level
+        skill_level=skill.skill_level,
+        category_id=None  # Set explicitly so the response has it without a refresh
     )
     db.add(new_skill)
     db.commit()
-    db.refresh(new_skill)
     return new_skill
 
 def add_skill_request_by_email(db: Session, email: str, skill_request: schemas.SkillRequestCreate):
-    user = get_user_by_email(db, email)
-    if not user:
+    user_id = get_user_id_from_email(db, email)
+    if user_id is None:
         return None
     
     new_request = models.SkillRequest(
-        user_id=user.id,
+        user_id=user_id,
         skill_name=skill_request.skill_name,
         description=skill_request.description
     )
     db.add(new_request)
     db.commit()
-    db.refresh(new_request)
     return new_request
 
-def get_skill_offers(db: Session):
-    return db.query(models.UserSkill).all()
+def add_skill_offers_bulk(db: Session, email: str, skills: List[schemas.SkillOfferCreate]):
+    """Insert several offered skills for one user in a single statement"""
+    user_id = get_user_id_from_email(db, email)
+    if user_id is None:
+        return None
+    
+    rows = [
+        {"user_id": user_id, "skill_name": skill.skill_name, "skill_level": skill.skill_level}
+        for skill in skills
+    ]
+    if rows:
+        db.execute(insert(models.UserSkill), rows)
+        db.commit()
+    return len(rows)
+
+def _keyset_page(db: Session, model, after: int, limit: int):
+    # Seek past the last id the client saw on the primary key index,
+    # so every page costs the same no matter how deep it is
+    return db.execute(
+        select(*model.__table__.columns)
+        .where(model.id > after)
+        .order_by(model.id)
+        .limit(limit)
+    ).all()
 
-def get_skill_requests(db: Session):
-    return db.query(models.SkillRequest).all()
+def get_skill_offers(db: Session, after: int = 0, limit: int = 100):
+    return _keyset_page(db, models.UserSkill, after, limit)
+
+def get_skill_requests(db: Session, after: int = 0, limit: int = 100):
+    return _keyset_page(db, models.SkillRequest, after, limit)
 
 # NEW: Get skills by email
 def get_user_skills_by_email(db: Session, email: str):
-    user = get_user_by_email(db, email)
+    email = schemas.normalize_email(email)
+    # selectinload fetches each skill collection with one IN query; joinedload
+    # would multiply the offered and needed rows against each other
+    user = db.query(models.User).options(
+        selectinload(models.User.skills_offered),
+        selectinload(models.User.skills_needed)
+    ).filter(models.User.email == email).first()
     if not user:
         return None
+    _cache_user(db, user)
     return user
 
+# JSON aggregation is spelled differently per dialect; type_=JSON makes both
+# come back as Python lists
+if IS_SQLITE:
+    _json_agg, _json_object = func.json_group_array, func.json_object
+else:
+    _json_agg, _json_object = func.json_agg, func.json_build_object
+
+def _skills_json(model, *columns):
+    """Correlated subquery collecting a user's skill rows as a JSON array.
+    It seeks the indexed user_id column, so its cost follows the user's own
+    skills rather than the size of the table."""
+    pairs = []
+    for column in columns:
+        pairs += [column.key, column]
+    return select(_json_agg(_json_object(*pairs), type_=JSON)).where(
+        model.user_id == models.User.id
+    ).scalar_subquery()
+
+def get_user_profile_by_email(db: Session, email: str):
+    """The user plus both skill lists in one round trip, as a dict shaped like
+    schemas.UserWithSkillsResponse; None if there is no such user"""
+    email = schemas.normalize_email(email)
+    row = db.execute(
+        select(
+            models.User.id,
+            models.User.name,
+            models.User.email,
+            models.User.about,
+            models.User.profile_photo,
+            models.User.linkedin_url,
+            models.User.github_url,
+            models.User.twitter_url,
+            _skills_json(
+                models.UserSkill,
+                models.UserSkill.id, models.UserSkill.skill_name, models.UserSkill.skill_level
+            ).label("skills_offered"),
+            _skills_json(
+                models.SkillRequest,
+                models.SkillRequest.id, models.SkillRequest.skill_name, models.SkillRequest.description
+            ).label("skills_needed")
+        ).where(models.User.email == email)
+    ).first()
+    if row is None:
+        return None
+    
+    profile = dict(row._mapping)
+    # PostgreSQL's json_agg gives NULL rather than [] for no rows
+    profile["skills_offered"] = profile["skills_offered"] or []
+    profile["skills_needed"] = profile["skills_needed"] or []
+    # Inside JSON the level is the raw stored int, so map it back to its name
+    level_type = models.SkillLevelType()
+    for skill in profile["skills_offered"]:
+        skill["skill_level"] = level_type.process_result_value(skill["skill_level"], None)
+    return profile
+
 # UPDATED: Matching function to use email
 def find_matches_by_email(db: Session, email: str):
-    """Find users who need skills that this user offers"""
+    """Find users who need skills that this user offers.
+    Returns (user, matches) so callers don't look the user up again."""
     user = get_user_by_email(db, email)
     if not user:
-        return []
-    
-    matches = []
+        return None, []
     
-    # For each skill this user offers
-    for offered_skill in user.skills_offered:
-        # Find users who need this skill
-        users_needing_skill = db.query(models.SkillRequest).filter(
-            models.SkillRequest.skill_name == offered_skill.skill_name
-        ).all()
-        
-        for request in users_needing_skill:
-            if request.user_id != user.id:  # Don't match with self
-                requester = get_user_by_id(db, request.user_id)
-                matches.append({
-                    "match_type": "you_can_teach",
-                    "your_skill": offered_skill.skill_name,
-                    "their_skill_level": offered_skill.skill_level,
-                    "matched_user": {
-                        "email": requester.email,
-                        "name": requester.name
-                    },
-                    "their_request": request.description
-                })
+    # Both directions in one round trip: this user's offers paired with
+    # everyone else's requests, UNION ALL their offers paired with this
+    # user's requests. Only the columns the response needs are selected.
+    teach = select(
+        literal(0).label("kind"),
+        models.UserSkill.skill_name,
+        models.UserSkill.skill_level,
+        models.User.email,
+        models.User.name,
+        models.SkillRequest.description
+    ).join(
+        models.SkillRequest, models.SkillRequest.skill_name == models.UserSkill.skill_name
+    ).join(
+        models.User, models.User.id == models.SkillRequest.user_id
+    ).where(
+        models.UserSkill.user_id == user.id,
+        models.SkillRequest.user_id != user.id  # Don't match with self
+    )
+    learn = select(
+        literal(1).label("kind"),
+        models.SkillRequest.skill_name,
+        models.UserSkill.skill_level,
+        models.User.email,
+        models.User.name,
+        null()
+    ).join(
+        models.UserSkill, models.UserSkill.skill_name == models.SkillRequest.skill_name
+    ).join(
+        models.User, models.User.id == models.UserSkill.user_id
+    ).where(
+        models.SkillRequest.user_id == user.id,
+        models.UserSkill.user_id != user.id  # Don't match with self
+    )
+    rows = db.execute(union_all(teach, learn).order_by("kind")).all()
     
-    # Also find users who can teach skills this user needs
-    for needed_skill in user.skills_needed:
-        # Find users who offer this skill
-        users_offering_skill = db.query(models.UserSkill).filter(
-            models.UserSkill.skill_name == needed_skill.skill_name
-        ).all()
-        
-        for offer in users_offering_skill:
-            if offer.user_id != user.id:  # Don't match with self
-                offerer = get_user_by_id(db, offer.user_id)
-                matches.append({
-                    "match_type": "you_can_learn",
-                    "skill_you_need": needed_skill.skill_name,
-                    "their_skill_level": offer.skill_level,
-                    "matched_user": {
-                        "email": offerer.email,
-                        "name": offerer.name
-                    },
-                    "their_offer": f"Can teach {offer.skill_name} at {offer.skill_level} level"
-                })
+    matches = []
+    for kind, skill_name, skill_level, other_email, other_name, description in rows:
+        matched_user = {"email": other_email, "name": other_name}
+        if kind == 0:
+            matches.append({
+                "match_type": "you_can_teach",
+                "your_skill": skill_name,
+                "their_skill_level": skill_level,
+                "matched_user": matched_user,
+                "their_request": description
+            })
+        else:
+            matches.append({
+                "match_type": "you_can_learn",
+                "skill_you_need": skill_name,
+                "their_skill_level": skill_level,
+                "matched_user": matched_user,
+                "their_offer": f"Can teach {skill_name} at {skill_level} level"
+            })
     
-    return matches
+    return user, matches
 
 
 # Messaging Crud Operations
-def send_message(db: Session, sender_email: str, message_data: schemas.MessageCreate):
-    # Get sender and receiver
-    sender = get_user_by_email(db, sender_email)
-    receiver = get_user_by_email(db, message_data.receiver_email)
+def send_message(db: Session, sender_id: int, message_data: schemas.MessageCreate):
+    # The caller already knows the sender, only the receiver needs a lookup
+    receiver_id = get_user_id_from_email(db, message_data.receiver_email)
     
-    if not sender or not receiver:
+    if receiver_id is None:
         return None
     
     # Create message
     new_message = models.Message(
-        sender_id=sender.id,
-        receiver_id=receiver.id,
+        sender_id=sender_id,
+        receiver_id=receiver_id,
         content=message_data.content
     )
     
@@ -152,106 +324,202 @@ def send_message(db: Session, sender_email: str, message_data: schemas.MessageCr
     db.refresh(new_message)
     return new_message
 
-def get_user_messages(db: Session, user_email: str):
-    user = get_user_by_email(db, user_email)
-    if not user:
+def _message_rows_query(db: Session):
+    """Select only the message columns the API returns, joined to both users.
+    Column order must match schemas.MessageRow."""
+    sender = aliased(models.User)
+    receiver = aliased(models.User)
+    return db.query(
+        models.Message.id,
+        models.Message.sender_id,
+        sender.email.label("sender_email"),
+        sender.name.label("sender_name"),
+        models.Message.receiver_id,
+        receiver.email.label("receiver_email"),
+        receiver.name.label("receiver_name"),
+        models.Message.content,
+        models.Message.timestamp,
+        models.Message.is_read
+    ).select_from(models.Message).outerjoin(
+        sender, models.Message.sender_id == sender.id
+    ).outerjoin(
+        receiver, models.Message.receiver_id == receiver.id
+    )
+
+def get_user_messages(db: Session, user_email: str, limit: Optional[int] = None, offset: int = 0):
+    user_id = get_user_id_from_email(db, user_email)
+    if user_id is None:
         return []
     
-    # Get all messages where user is sender or receiver
-    messages = db.query(models.Message).filter(
-        (models.Message.sender_id == user.id) | 
-        (models.Message.receiver_id == user.id)
-    ).order_by(models.Message.timestamp.desc()).all()
-    
-    # Format response with user details
-    result = []
-    for msg in messages:
-        result.append({
-            "id": msg.id,
-            "sender_id": msg.sender_id,
-            "sender_email": msg.sender.email if msg.sender else None,
-            "sender_name": msg.sender.name if msg.sender else None,
-            "receiver_id": msg.receiver_id,
-            "receiver_email": msg.receiver.email if msg.receiver else None,
-            "receiver_name": msg.receiver.name if msg.receiver else None,
-            "content": msg.content,
-            "timestamp": msg.timestamp,
-            "is_read": msg.is_read
-        })
+    # Get all messages where user is sender or receiver - two index seeks
+    # combined with UNION ALL instead of an OR the planner can't index.
+    # Self-messages would show up in both halves, so the second one skips them.
+    sent = _message_rows_query(db).filter(models.Message.sender_id == user_id)
+    received = _message_rows_query(db).filter(
+        models.Message.receiver_id == user_id,
+        models.Message.sender_id != user_id
+    )
+    query = sent.union_all(received).order_by(
+        models.Message.timestamp.desc()
+    ).offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
     
-    return result
+    # Rows already carry the user details, no ORM objects needed
+    return (schemas.MessageRow(*row) for row in query.yield_per(STREAM_BATCH_SIZE))
 
 def get_conversation(db: Session, user1_email: str, user2_email: str):
-    user1 = get_user_by_email(db, user1_email)
-    user2 = get_user_by_email(db, user2_email)
+    user1_id = get_user_id_from_email(db, user1_email)
+    user2_id = get_user_id_from_email(db, user2_email)
     
-    if not user1 or not user2:
+    if user1_id is None or user2_id is None:
         return []
     
     # Get messages between these two users
-    messages = db.query(models.Message).filter(
-        ((models.Message.sender_id == user1.id) & (models.Message.receiver_id == user2.id)) |
-        ((models.Message.sender_id == user2.id) & (models.Message.receiver_id == user1.id))
+    rows = _message_rows_query(db).filter(
+        ((models.Message.sender_id == user1_id) & (models.Message.receiver_id == user2_id)) |
+        ((models.Message.sender_id == user2_id) & (models.Message.receiver_id == user1_id))
     ).order_by(models.Message.timestamp.asc()).all()
     
     # Format response properly
     result = []
-    for msg in messages:
-        result.append({
-            "id": msg.id,
-            "sender_id": msg.sender_id,
-            "sender_email": msg.sender.email if msg.sender else None,
-            "sender_name": msg.sender.name if msg.sender else "Unknown",
-            "receiver_id": msg.receiver_id,
-            "receiver_email": msg.receiver.email if msg.receiver else None,
-            "receiver_name": msg.receiver.name if msg.receiver else "Unknown",
-            "content": msg.content,
-            "timestamp": msg.timestamp,
-            "is_read": msg.is_read == 1
-        })
+    for row in rows:
+        msg = schemas.MessageRow(*row)
+        if msg.sender_email is None:
+            msg.sender_name = "Unknown"
+        if msg.receiver_email is None:
+            msg.receiver_name = "Unknown"
+        result.append(msg)
     
     return result
 
-def mark_messages_as_read(db: Session, user_email: str, other_user_email: str):
-    user = get_user_by_email(db, user_email)
-    other_user = get_user_by_email(db, other_user_email)
+# Inbox rows only need the start of the last message
+MESSAGE_PREVIEW_LENGTH = 80
+
+def get_conversation_list(db: Session, user_email: str):
+    """One row per chat partner with the latest message and how many of theirs
+    are unread, newest conversation first."""
+    user_id = get_user_id_from_email(db, user_email)
+    if user_id is None:
+        return []
     
-    if not user or not other_user:
-        return 0
+    # Same two index seeks as get_user_messages, tagging each row with the partner
+    sent = select(
+        models.Message.receiver_id.label("other_id"),
+        models.Message.id,
+        models.Message.timestamp,
+        literal(0).label("unread")
+    ).where(models.Message.sender_id == user_id)
+    received = select(
+        models.Message.sender_id.label("other_id"),
+        models.Message.id,
+        models.Message.timestamp,
+        case((models.Message.is_read == false(), 1), else_=0).label("unread")
+    ).where(
+        models.Message.receiver_id == user_id,
+        models.Message.sender_id != user_id
+    )
+    messages = union_all(sent, received).subquery()
     
-    # Mark messages from other_user to user as read
-    updated = db.query(models.Message).filter(
-        (models.Message.sender_id == other_user.id) &
-        (models.Message.receiver_id == user.id) &
-        (models.Message.is_read == 0)
-    ).update({"is_read": 1})
+    # Rank each partner's messages newest first and total their unread in the
+    # same pass, then keep only the top row per partner. Timestamps can tie,
+    # so the id breaks ties. Content stays out of the sort; only the winning
+    # rows read it, and only a prefix.
+    by_partner = select(
+        messages.c.other_id,
+        messages.c.id,
+        messages.c.timestamp,
+        func.row_number().over(
+            partition_by=messages.c.other_id,
+            order_by=(messages.c.timestamp.desc(), messages.c.id.desc())
+        ).label("rn"),
+        func.sum(messages.c.unread).over(partition_by=messages.c.other_id).label("unread_count")
+    ).subquery()
+    
+    rows = db.execute(
+        select(
+            models.User.name.label("other_user_name"),
+            models.User.email.label("other_user_email"),
+            func.substr(models.Message.content, 1, MESSAGE_PREVIEW_LENGTH).label("last_message"),
+            by_partner.c.timestamp.label("last_message_time"),
+            by_partner.c.unread_count
+        )
+        .join(models.User, models.User.id == by_partner.c.other_id)
+        .join(models.Message, models.Message.id == by_partner.c.id)
+        .where(by_partner.c.rn == 1)
+        .order_by(by_partner.c.timestamp.desc(), by_partner.c.id.desc())
+    ).all()
+    
+    return [schemas.ConversationResponse(*row) for row in rows]
+
+def mark_messages_as_read(db: Session, user_email: str, other_user_email: str):
+    # Resolve both users inside the UPDATE so the whole call is one statement;
+    # an unknown email makes the subquery NULL and nothing matches
+    def user_id(email):
+        return select(models.User.id).where(
+            models.User.email == schemas.normalize_email(email)
+        ).scalar_subquery()
+
+    result = db.execute(
+        update(models.Message)
+        .where(
+            models.Message.sender_id == user_id(other_user_email),
+            models.Message.receiver_id == user_id(user_email),
+            models.Message.is_read == false()
+        )
+        .values(is_read=True)
+        .execution_options(synchronize_session=False)
+    )
     
     db.commit()
-    return updated
+    return result.rowcount
 
 def get_unread_count(db: Session, user_email: str):
-    user = get_user_by_email(db, user_email)
-    if not user:
+    user_id = get_user_id_from_email(db, user_email)
+    if user_id is None:
         return 0
     
-    count = db.query(models.Message).filter(
-        (models.Message.receiver_id == user.id) &
-        (models.Message.is_read == 0)
-    ).count()
+    # Plain COUNT(*), answered from ix_msg_receiver_unread_ts alone; Query.count()
+    # would wrap a SELECT of every message column in a subquery first
+    return db.execute(
+        select(func.count()).select_from(models.Message).where(
+            models.Message.receiver_id == user_id,
+            models.Message.is_read == false()
+        )
+    ).scalar_one()
+
+def has_unread(db: Session, user_email: str):
+    """Cheaper than get_unread_count when only a yes/no badge is needed"""
+    user_id = get_user_id_from_email(db, user_email)
+    if user_id is None:
+        return False
     
-    return count
+    return db.query(exists().where(
+        (models.Message.receiver_id == user_id) &
+        (models.Message.is_read == false())
+    )).scalar() or False
+
+
 
 
 
 
+# Video rooms are hosted on Jitsi; the room id doubles as the meeting path
+ROOM_ID_PREFIX = "skillswap-"
+MEETING_URL_PREFIX = "https://meet.jit.si/"
 
+def _uuid7():
+    """Time-ordered UUID (version 7): 48-bit millisecond timestamp + random bits"""
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # variant
+    return uuid.UUID(int=value)
 
 def create_video_session(db: Session, session_data: schemas.VideoSessionCreate):
-    timestamp = int(time.time())
-    random_str = secrets.token_hex(4)
-    room_id = f"skillswap-{timestamp}-{random_str}"
+    # Time-ordered ids keep new rows at the end of the room_id index
+    room_id = ROOM_ID_PREFIX + _uuid7().hex
     
-    meeting_url = f"https://meet.jit.si/{room_id}"
+    meeting_url = MEETING_URL_PREFIX + room_id
     
     new_session = models.VideoSession(
         room_id=room_id,
@@ -267,10 +535,12 @@ def create_video_session(db: Session, session_data: schemas.VideoSessionCreate):
     return new_session
 
 def get_video_sessions_by_user(db: Session, email: str):
-    return db.query(models.VideoSession).filter(
+    email = schemas.normalize_email(email)
+    # Column rows rather than ORM objects - the endpoint only serializes them
+    return db.execute(select(*models.VideoSession.__table__.columns).where(
         (models.VideoSession.user1_email == email) | 
         (models.VideoSession.user2_email == email)
-    ).order_by(models.VideoSession.created_at.desc()).all()
+    ).order_by(models.VideoSession.created_at.desc())).all()
 
 def update_video_session_status(db: Session, room_id: str, status: str):
     session = db.query(models.VideoSession).filter(
@@ -278,13 +548,15 @@ def update_video_session_status(db: Session, room_id: str, status: str):
     ).first()
     
     if session:
+        now = datetime.utcnow()
         session.status = status
         if status == "active" and not session.started_at:
-            session.started_at = datetime.utcnow()
+            session.started_at = now
         elif status == "ended":
-            session.ended_at = datetime.utcnow()
+            session.ended_at = now
             if session.started_at:
-                duration = (datetime.utcnow() - session.started_at).seconds
+                # total_seconds() - .seconds wraps around for calls longer than a day
+                duration = int((now - session.started_at).total_seconds())
                 session.duration_seconds = duration
         
         db.commit()
@@ -292,14 +564,51 @@ def update_video_session_status(db: Session, room_id: str, status: str):
     
     return session
 
+def _elapsed_seconds(start, now: datetime):
+    """Whole seconds from a timestamp column to now, truncated like int()"""
+    if IS_SQLITE:
+        return cast((func.julianday(now) - func.julianday(start)) * 86400, Integer)
+    # Postgres rounds when casting, so floor first
+    return cast(func.floor(extract("epoch", literal(now, DateTime) - start)), Integer)
+
+def end_video_sessions_bulk(db: Session, room_ids: List[str]):
+    """End many sessions in one UPDATE; returns how many rows changed"""
+    if not room_ids:
+        return 0
+    now = datetime.utcnow()
+    result = db.execute(
+        update(models.VideoSession)
+        .where(
+            models.VideoSession.room_id.in_(room_ids),
+            models.VideoSession.status != "ended"
+        )
+        .values(
+            status="ended",
+            ended_at=now,
+            # Same whole-second duration as update_video_session_status, computed in SQL
+            duration_seconds=_elapsed_seconds(models.VideoSession.started_at, now)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
 # --- Inside crud.py ---
 
 def get_active_video_call(db: Session, email: str):
-    """Find only brand-new calls for this user"""
-    return db.query(models.VideoSession).filter(
+    """Find only brand-new calls for this user; returns (room_id, user1_email)"""
+    email = schemas.normalize_email(email)
+    # Polled constantly: lambda_stmt caches the built statement, so only the
+    # email parameter changes between calls
+    return db.execute(lambda_stmt(lambda: select(
+        models.VideoSession.room_id,
+        models.VideoSession.user1_email
+    ).where(
         models.VideoSession.user2_email == email,
-        models.VideoSession.status == "created"  # Change this from .in_([...]) to just "created"
-    ).order_by(models.VideoSession.created_at.desc()).first()
+        # Inlined rather than bound so SQLite can match ix_active_incoming's WHERE
+        models.VideoSession.status == literal_column("'created'")
+    ).order_by(models.VideoSession.created_at.desc()).limit(1))).first()
+
 def decline_video_call(db: Session, room_id: str):
     session = db.query(models.VideoSession).filter(
         models.VideoSession.room_id == room_id
@@ -312,7 +621,7 @@ def decline_video_call(db: Session, room_id: str):
 # --- Feed Logic ---
 def create_post(db: Session, email: str, post: schemas.PostCreate):
     db_post = models.Post(
-        author_email=email,
+        author_email=schemas.normalize_email(email),
         content=post.content,
         category=post.category
     )
@@ -322,19 +631,42 @@ def create_post(db: Session, email: str, post: schemas.PostCreate):
     return db_post
 
 def get_posts(db: Session, skip: int = 0, limit: int = 50):
-    return db.query(models.Post).order_by(models.Post.created_at.desc()).offset(skip).limit(limit).all()
+    rows = db.query(
+        models.Post.id,
+        models.Post.author_email,
+        models.Post.content,
+        models.Post.category,
+        models.Post.created_at
+    ).order_by(models.Post.created_at.desc()).offset(skip).limit(limit).all()
+    # Rows come straight from our own table, so skip re-validating them
+    return [schemas.PostResponse.model_construct(**row._mapping) for row in rows]
+
+def get_posts_version(db: Session):
+    """Cheap change marker for the feed - posts are only ever added"""
+    return tuple(db.query(func.count(models.Post.id), func.max(models.Post.id)).one())
 
 # --- Group Chat Logic ---
 def get_all_groups(db: Session):
     return db.query(models.GroupChat).all()
 
+def get_groups_version(db: Session):
+    return tuple(db.query(func.count(models.GroupChat.id), func.max(models.GroupChat.id)).one())
+
 def get_group_messages(db: Session, group_id: int):
-    messages = db.query(models.GroupMessage).filter(models.GroupMessage.group_id == group_id).all()
-    return messages if messages else []
+    rows = db.execute(
+        select(
+            models.GroupMessage.id,
+            models.GroupMessage.group_id,
+            models.GroupMessage.sender_email,
+            models.GroupMessage.content,
+            models.GroupMessage.timestamp
+        ).where(models.GroupMessage.group_id == group_id)
+    ).all()
+    return [schemas.GroupMessageRow(*row) for row in rows]
 def create_group_message(db: Session, group_id: int, email: str, content: str):
     db_msg = models.GroupMessage(
         group_id=group_id,
-        sender_email=email,
+        sender_email=schemas.normalize_email(email),
         content=content
     )
     db.add(db_msg)
@@ -344,8 +676,8 @@ def create_group_message(db: Session, group_id: int, email: str, content: str):
 
 def create_booking(db: Session, learner: str, teacher: str, skill: str, date: str, time: str):
     new_booking = models.Booking(
-        learner_email=learner,
-        teacher_email=teacher,
+        learner_email=schemas.normalize_email(learner),
+        teacher_email=schemas.normalize_email(teacher),
         skill_name=skill,
         session_date=date,
         session_time=time
@@ -355,6 +687,7 @@ def create_booking(db: Session, learner: str, teacher: str, skill: str, date: st
     return new_booking
 
 def get_user_bookings(db: Session, email: str):
+    email = schemas.normalize_email(email)
     # Get bookings where user is either the teacher or the learner
     return db.query(models.Booking).filter(
         (models.Booking.learner_email == email) | 
@@ -1,17 +1,62 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, declarative_base, raiseload
+from sqlalchemy.pool import QueuePool, StaticPool
+from sqlalchemy.sql.expression import StatementLambdaElement
 
-# SQLite database URL - creates a file called "skillswap.db" in your folder
-SQLALCHEMY_DATABASE_URL = "sqlite:///./skillswap.db"
+# Database URL - defaults to a SQLite file called "skillswap.db" in your folder;
+# set DATABASE_URL to point the app at another database server
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./skillswap.db")
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+
+# Connection pool limits
+POOL_SIZE = 20
+MAX_OVERFLOW = 10
+
+# In-memory SQLite only exists on one connection, so it has to be shared
+if SQLALCHEMY_DATABASE_URL in ("sqlite://", "sqlite:///:memory:"):
+    pool_options = {"poolclass": StaticPool}
+else:
+    pool_options = {
+        "poolclass": QueuePool,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": 30,  # Seconds to wait for a free connection before erroring
+        "pool_pre_ping": True,
+        "pool_recycle": 3600
+    }
 
 # Create the database engine
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}  # Needed for SQLite
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},  # Needed for SQLite
+    **pool_options
 )
 
+if IS_SQLITE:
+    # WAL lets readers keep going while a write is in progress
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
+
 # Create SessionLocal class - used to get database sessions
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Objects keep their values after commit, so writers don't need a refresh SELECT
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# DEBUG=1 makes any relationship that wasn't eager-loaded raise on access,
+# so an accidental lazy load (and the N+1 it brings) fails loudly in dev
+if os.getenv("DEBUG") == "1":
+    @event.listens_for(SessionLocal, "do_orm_execute")
+    def raise_on_lazy_load(state):
+        # Leave lambda_stmt queries alone: re-wrapping one with .options() would
+        # pin the first call's parameters, and they only select plain columns
+        if state.is_select and not isinstance(state.statement, StatementLambdaElement):
+            state.statement = state.statement.options(raiseload("*"))
 
 # Base class for our models
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
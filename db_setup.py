@@ -0,0 +1,165 @@
+# Creates and upgrades the SkillSwap schema. This has to run once per
+# deployment, not once per worker - concurrent create_all calls race on their
+# check-then-create steps. Gunicorn runs it in the master (gunicorn_conf.py),
+# a plain `uvicorn main:app` runs it from the lifespan, and where the schema
+# is managed separately it can be run on its own:
+#   python db_setup.py
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from sqlalchemy import Integer, inspect, insert, select, text, update
+import database
+import models
+import schemas
+
+try:
+    import fcntl
+except ImportError:  # Windows - only single-process dev servers there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Set once setup has run in a parent process, so forked workers skip it
+SCHEMA_READY_ENV = "SKILLSWAP_SCHEMA_READY"
+
+# Serializes setup between processes on one host that start at the same time
+LOCK_FILE = os.getenv("SCHEMA_LOCK_FILE", os.path.join(tempfile.gettempdir(), "skillswap-schema.lock"))
+
+# Indexes older databases may still carry that no query uses any more
+RETIRED_INDEXES = (
+    "ix_unread_by_receiver",
+    "ix_msg_recv_read",  # Prefix of ix_msg_receiver_unread_ts
+    "ix_video_u2_status_created",  # Replaced by the ix_active_incoming partial index
+)
+
+# Group chats created on first startup
+SEED_GROUPS = [
+    {"name": "Python & Coding", "description": "Discussion for tech learners"},
+    {"name": "Language Exchange", "description": "Practice speaking different languages"},
+    {"name": "Music & Arts", "description": "Share your creative progress"}
+]
+
+# Old skill_level text -> SkillLevel int. Digit strings are ints a text column
+# stored as text; any other value was never a valid level and becomes NULL.
+SKILL_LEVEL_SQL = """CASE lower(trim(skill_level))
+    WHEN 'beginner' THEN 0 WHEN '0' THEN 0
+    WHEN 'intermediate' THEN 1 WHEN '1' THEN 1
+    WHEN 'expert' THEN 2 WHEN '2' THEN 2
+END"""
+
+def migrate_skill_levels(conn):
+    """Turn a text user_skills.skill_level (databases created before it was
+    a SmallInteger) into an integer column holding SkillLevel values"""
+    columns = {column["name"]: column for column in inspect(conn).get_columns("user_skills")}
+    if isinstance(columns["skill_level"]["type"], Integer):
+        return
+    unknown = conn.execute(text(
+        f"SELECT count(*) FROM user_skills WHERE skill_level IS NOT NULL AND ({SKILL_LEVEL_SQL}) IS NULL"
+    )).scalar()
+    if unknown:
+        logger.warning("Clearing %d skill levels that are not beginner/intermediate/expert", unknown)
+    
+    if conn.dialect.name != "sqlite":
+        conn.execute(text(
+            f"ALTER TABLE user_skills ALTER COLUMN skill_level TYPE SMALLINT USING {SKILL_LEVEL_SQL}"
+        ))
+        return
+    # SQLite can't change a column's type, so rebuild the table around it.
+    # Index names stay taken by the renamed table, so drop those first.
+    conn.execute(text("ALTER TABLE user_skills RENAME TO user_skills_old"))
+    for index in inspect(conn).get_indexes("user_skills_old"):
+        conn.execute(text(f"DROP INDEX {index['name']}"))
+    models.UserSkill.__table__.create(conn)
+    conn.execute(text(
+        "INSERT INTO user_skills (id, user_id, skill_name, skill_level, category_id) "
+        f"SELECT id, user_id, skill_name, {SKILL_LEVEL_SQL}, category_id FROM user_skills_old"
+    ))
+    conn.execute(text("DROP TABLE user_skills_old"))
+
+# Every column holding a user's email, besides users.email itself
+EMAIL_REFERENCES = (
+    models.VideoSession.user1_email, models.VideoSession.user2_email,
+    models.Post.author_email, models.GroupMessage.sender_email,
+    models.Booking.learner_email, models.Booking.teacher_email
+)
+
+def migrate_emails(conn):
+    """Rewrite emails saved before schemas.Email normalized them. Values are
+    normalized in Python for every column - SQL lower() only folds ASCII."""
+    users = conn.execute(select(models.User.id, models.User.email)).all()
+    by_email = {}
+    for user_id, email in users:
+        if email is not None:
+            by_email.setdefault(schemas.normalize_email(email), []).append(email)
+    # Normalized lookups would only ever reach one of these accounts
+    collisions = [emails for emails in by_email.values() if len(emails) > 1]
+    if collisions:
+        raise RuntimeError(
+            "These accounts differ only in email case or spacing; merge or rename "
+            f"them, then restart: {collisions}"
+        )
+    
+    for column in (models.User.email,) + EMAIL_REFERENCES:
+        for (email,) in conn.execute(select(column).distinct().where(column.is_not(None))):
+            normalized = schemas.normalize_email(email)
+            if normalized != email:
+                conn.execute(
+                    update(column.class_).where(column == email).values({column.key: normalized})
+                )
+
+# Applied in order, each once per database and recorded in schema_migrations
+MIGRATIONS = (
+    ("skill_level_smallint", migrate_skill_levels),
+    ("normalized_emails", migrate_emails),
+)
+
+def apply_migrations():
+    with database.engine.begin() as conn:
+        applied = set(conn.scalars(select(models.SchemaMigration.name)))
+    for name, migrate in MIGRATIONS:
+        if name in applied:
+            continue
+        with database.engine.begin() as conn:
+            migrate(conn)
+            conn.execute(insert(models.SchemaMigration).values(name=name))
+        logger.info("Applied migration %s", name)
+
+@contextmanager
+def setup_lock():
+    if fcntl is None:
+        yield
+        return
+    with open(LOCK_FILE, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def prepare_database():
+    with setup_lock():
+        # 1. Create missing tables
+        models.Base.metadata.create_all(bind=database.engine)
+        # create_all skips tables that already exist, so add any index
+        # declared since an older database was created...
+        for table in models.Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=database.engine, checkfirst=True)
+        # ...and drop the ones that have been retired
+        with database.engine.begin() as conn:
+            for name in RETIRED_INDEXES:
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+        # 2. One-off data and column changes for databases made by older versions
+        apply_migrations()
+
+        # 3. Setup initial groups - a single multi-row INSERT, skipped once any group exists
+        with database.engine.begin() as conn:
+            if conn.execute(select(models.GroupChat.id).limit(1)).first() is None:
+                conn.execute(insert(models.GroupChat).values(SEED_GROUPS))
+
+    os.environ[SCHEMA_READY_ENV] = "1"
+
+if __name__ == "__main__":
+    prepare_database()
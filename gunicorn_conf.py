@@ -0,0 +1,30 @@
+# Gunicorn settings for running SkillSwap in production:
+#   gunicorn main:app -c gunicorn_conf.py
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+
+# 2n+1 Uvicorn worker processes for n cores, each with its own event loop
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Heartbeat files on tmpfs so a slow disk can't make workers look hung
+worker_tmp_dir = "/dev/shm"
+timeout = 60
+
+# Import the app once in the master so workers share its memory copy-on-write
+preload_app = True
+
+def on_starting(server):
+    # Set up the schema once, in the master, before any worker boots -
+    # workers running it side by side race on create_all. Workers inherit
+    # the ready flag and skip it.
+    if os.getenv("AUTO_CREATE_TABLES", "1") == "1":
+        import db_setup
+        db_setup.prepare_database()
+
+def post_fork(server, worker):
+    # Pooled connections must never be shared across processes
+    import database
+    database.engine.dispose(close=False)
@@ -1,67 +1,153 @@
-from fastapi import FastAPI, Depends, HTTPException, Request, Form
+from fastapi import FastAPI, BackgroundTasks, Depends, HTTPException, Query, Request, Form
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, RedirectResponse, Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
+from anyio import from_thread
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 import database
+import db_setup
 import models
 import schemas
 import crud
-from auth import verify_password
+from auth import hash_password_async, verify_and_update_password_async
 from typing import List, Optional
-import time
-import secrets
-
-
-
-# Create database tables
-models.Base.metadata.create_all(bind=database.engine)
-
-app = FastAPI()
-
-# Setup templates for frontend
-templates = Jinja2Templates(directory="templates")
-
-# For serving static files (CSS, JS later)
-app.mount("/static", StaticFiles(directory="static"), name="static")
+from contextlib import asynccontextmanager
+import json
+import orjson
+import os
+import asyncio
+import hashlib
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Seconds an idle /video/events stream waits before re-checking for calls
+# (and sending a keep-alive). Calls created on another worker are only seen
+# on this re-check, so it matches the 5 s the old polling loop used.
+CALL_EVENTS_RECHECK = 5
+
+# Largest page the keyset-paginated skill listings will return
+SKILL_PAGE_MAX = 500
+
+# Setup templates for frontend - templates don't change while the app runs,
+# so skip the per-render mtime check and keep every compiled template cached.
+# Compiled bytecode also goes to disk (JINJA_CACHE_DIR, default a per-user temp
+# dir) so new workers load templates without re-parsing them.
+templates = Jinja2Templates(
+    directory="templates",
+    auto_reload=False,
+    cache_size=-1,
+    bytecode_cache=FileSystemBytecodeCache(os.getenv("JINJA_CACHE_DIR"))
+)
 
 def get_db():
+    # One plain session per request. A thread-local scoped_session doesn't fit:
+    # async endpoints all share the event-loop thread, and a sync dependency
+    # can run on a different pool thread than its endpoint
     db = database.SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
-# ========== FRONTEND ROUTES ==========
-from contextlib import asynccontextmanager
+def run_in_new_session(func, *args):
+    """Run a crud function with its own session, e.g. from a background task
+    that outlives the request-scoped one"""
+    with database.SessionLocal() as db:
+        return func(db, *args)
+
+def column_dict(obj):
+    """Every column of a freshly written row, including ones left at NULL"""
+    return {column.key: getattr(obj, column.key) for column in obj.__table__.columns}
+
+def stream_json_list(items, to_json=jsonable_encoder):
+    """Stream an iterable as a JSON array, one element at a time.
+    Pass to_json=None for items orjson encodes as-is (dicts, dataclasses)."""
+    def generate():
+        yield b"["
+        for i, item in enumerate(items):
+            if i:
+                yield b","
+            yield orjson.dumps(to_json(item) if to_json else item)
+        yield b"]"
+    return StreamingResponse(generate(), media_type="application/json")
+
+def etag_response(request: Request, version, build, max_age: int = 0):
+    """Answer 304 when the client's ETag matches `version`, else build the body
+    (plain JSON-ready data - dicts, lists, dataclasses) and send it.
+    With max_age=0 clients must revalidate on every use but may still get a 304."""
+    etag = '"' + hashlib.md5(repr(version).encode()).hexdigest() + '"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}" if max_age else "no-cache"
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return ORJSONResponse(build(), headers=headers)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # This runs when the app starts
-    db = database.SessionLocal()
     try:
-        # 1. Force create all tables (including the new ones)
-        models.Base.metadata.create_all(bind=database.engine)
-        
-        # 2. Setup initial groups
-        existing = db.query(models.GroupChat).first()
-        if not existing:
-            groups = [
-                models.GroupChat(name="Python & Coding", description="Discussion for tech learners"),
-                models.GroupChat(name="Language Exchange", description="Practice speaking different languages"),
-                models.GroupChat(name="Music & Arts", description="Share your creative progress")
-            ]
-            db.add_all(groups)
-            db.commit()
-    except Exception as e:
-        print(f"Error during startup: {e}")
-    finally:
-        db.close()
+        # 1. Create and upgrade the schema, unless a parent process (the
+        #    Gunicorn master) already did, or AUTO_CREATE_TABLES=0 says it is
+        #    managed separately with `python db_setup.py`
+        if (os.getenv("AUTO_CREATE_TABLES", "1") == "1"
+                and os.getenv(db_setup.SCHEMA_READY_ENV) != "1"):
+            db_setup.prepare_database()
+    except Exception:
+        # Fail the worker at boot rather than serve 500s from a broken database
+        logger.exception("Startup failed")
+        raise
+    
+    # 2. Compile every template now so the first page view doesn't pay for it
+    for name in templates.env.list_templates():
+        templates.env.get_template(name)
     
     yield
     # This runs when the app shuts down
+    database.engine.dispose()
+
+# orjson encodes the JSON endpoints' list/dict payloads much faster than stdlib json
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+class EventStreamAwareGZip(GZipMiddleware):
+    """GZip for everything except the /video/events SSE streams - gzip holds
+    small events in its buffer, so calls would only show up once it filled"""
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith("/video/events/"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+# HTML pages and JSON lists compress several times over; level 5 keeps CPU low
+app.add_middleware(EventStreamAwareGZip, minimum_size=500, compresslevel=5)
+
+# Files named like app.3f2a9c1e.css carry a content hash, so they never change
+HASHED_ASSET = re.compile(r"\.[0-9a-f]{8,}\.\w+$")
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with browser caching: hashed assets are immutable for a
+    year, anything else may be reused for an hour before revalidating.
+    In production these are better served straight from Nginx/a CDN."""
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if HASHED_ASSET.search(str(full_path)):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = "public, max-age=3600"
+        return response
 
-app = FastAPI(lifespan=lifespan)
+# For serving static files (CSS, JS later)
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
+
+# ========== FRONTEND ROUTES ==========
 
 @app.get("/")
 def home_page(request: Request):
@@ -112,72 +198,86 @@ def messages_page(request: Request, email: Optional[str] = None):
 # ========== FRONTEND ACTION ENDPOINTS ==========
 
 @app.post("/register-user")
-def register_user_frontend(
+async def register_user_frontend(
     request: Request,
     name: str = Form(...),
     email: str = Form(...),
     password: str = Form(...),
     db: Session = Depends(get_db)
 ):
+    # Validate first so the existence check uses the normalized email
+    user_data = schemas.USER_CREATE_ADAPTER.validate_python(
+        {"name": name, "email": email, "password": password}
+    )
+    
     # Check if user exists
-    db_user = crud.get_user_by_email(db, email=email)
-    if db_user:
+    if await run_in_threadpool(crud.email_exists, db, user_data.email):
         return templates.TemplateResponse("register.html", {
             "request": request, 
             "error": "Email already registered"
         })
     
-    # Create user using existing API schema
-    user_data = schemas.UserCreate(name=name, email=email, password=password)
-    crud.create_user(db=db, user=user_data)
+    # Create user using existing API schema, hashing off the request thread
+    hashed_password = await hash_password_async(password)
+    await run_in_threadpool(crud.create_user, db, user_data, hashed_password)
     
     # Redirect to profile
-    return RedirectResponse(f"/profile-page?email={email}", status_code=303)
+    return RedirectResponse(f"/profile-page?email={user_data.email}", status_code=303)
 
 @app.post("/login-user")
-def login_user_frontend(
+async def login_user_frontend(
     request: Request,
     email: str = Form(...),
     password: str = Form(...),
     db: Session = Depends(get_db)
 ):
-    user = crud.get_user_by_email(db, email)
+    user = await run_in_threadpool(crud.get_user_by_email, db, email)
     if not user:
         return templates.TemplateResponse("login.html", {
             "request": request, 
             "error": "User not found"
         })
     
-    is_valid = verify_password(password, user.password)
+    # Argon2 verification is deliberately slow, keep it off the event loop
+    is_valid, new_hash = await verify_and_update_password_async(password, user.password)
     if not is_valid:
         return templates.TemplateResponse("login.html", {
             "request": request, 
             "error": "Invalid password"
         })
     
-    # Login successful - redirect to profile
-    return RedirectResponse(f"/profile-page?email={email}", status_code=303)
+    # Login successful - move old hashes to the current argon2 settings
+    if new_hash:
+        await run_in_threadpool(crud.update_user_password, db, user.id, new_hash)
+    
+    # Redirect to profile
+    return RedirectResponse(f"/profile-page?email={user.email}", status_code=303)
 
 @app.post("/add-skill-frontend")
 def add_skill_frontend(
     email: str = Form(...),
     skill_type: str = Form(...),
     skill_name: str = Form(...),
-    skill_level: str = Form("intermediate"),
+    skill_level: schemas.SkillLevelName = Form("intermediate"),
     description: str = Form(""),
     db: Session = Depends(get_db)
 ):
+    # The Form parameters above already enforce every field's type (and the
+    # level's allowed values), so build the schemas without validating again
     if skill_type == "offer":
-        skill_data = schemas.SkillOfferCreate(skill_name=skill_name, skill_level=skill_level)
+        skill_data = schemas.SkillOfferCreate.model_construct(
+            skill_name=skill_name, skill_level=skill_level
+        )
         crud.add_skill_offer_by_email(db, email, skill_data)
     else:
-        skill_request = schemas.SkillRequestCreate(skill_name=skill_name, description=description)
+        skill_request = schemas.SkillRequestCreate.model_construct(
+            skill_name=skill_name, description=description
+        )
         crud.add_skill_request_by_email(db, email, skill_request)
     
     return RedirectResponse(f"/profile-page?email={email}", status_code=303)
 
-@app.get("/video/check-incoming/{email}")
-def check_incoming_call(email: str, db: Session = Depends(get_db)):
+def incoming_call_status(db: Session, email: str):
     call = crud.get_active_video_call(db, email)
     if call:
         return {
@@ -187,30 +287,86 @@ def check_incoming_call(email: str, db: Session = Depends(get_db)):
         }
     return {"has_call": False}
 
+@app.get("/video/check-incoming/{email}")
+def check_incoming_call(request: Request, email: str, db: Session = Depends(get_db)):
+    # Polled repeatedly and almost always unchanged - answer repeats with a 304
+    status = incoming_call_status(db, email)
+    return etag_response(request, status, lambda: status)
+
+# Open /video/events streams, keyed by callee email. Each stream owns an
+# asyncio.Event that is set when a call is created for that user, so a call
+# made on the same worker shows up at once. This is per-process: a call made
+# on another worker is picked up by the CALL_EVENTS_RECHECK poll.
+call_listeners = {}
+
+def notify_call_listeners(email: str):
+    for event in call_listeners.get(email, ()):
+        event.set()
+
+@app.get("/video/events/{email}")
+async def incoming_call_events(email: str):
+    """Server-Sent Events replacement for polling /video/check-incoming"""
+    # Listeners are keyed the way video sessions store the callee's email
+    email = schemas.normalize_email(email)
+    async def event_stream():
+        event = asyncio.Event()
+        call_listeners.setdefault(email, set()).add(event)
+        last_room_id = None
+        try:
+            while True:
+                event.clear()
+                # Fresh short-lived session so the stream doesn't pin a pooled connection
+                status = await run_in_threadpool(run_in_new_session, incoming_call_status, email)
+                if status["has_call"] and status["room_id"] != last_room_id:
+                    last_room_id = status["room_id"]
+                    yield f"data: {json.dumps(status)}\n\n"
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=CALL_EVENTS_RECHECK)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            listeners = call_listeners.get(email)
+            if listeners is not None:
+                listeners.discard(event)
+                if not listeners:
+                    call_listeners.pop(email, None)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
 # ========== BACKEND APIs (UNCHANGED) ==========
 
-@app.get("/")
+@app.get("/api")
 def read_root():
     return {"message": "SkillSwap API - Now Email-Based!"}
 
 @app.post("/register", response_model=schemas.UserResponse)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
-    if db_user:
+async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    if await run_in_threadpool(crud.email_exists, db, user.email):
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db=db, user=user)
+    hashed_password = await hash_password_async(user.password)
+    new_user = await run_in_threadpool(crud.create_user, db, user, hashed_password)
+    return ORJSONResponse(schemas.UserResponse.from_orm_fast(new_user).model_dump())
 
 @app.get("/users", response_model=list[schemas.UserResponse])
 def read_users(db: Session = Depends(get_db)):
-    return crud.get_users(db)
+    return stream_json_list(
+        crud.get_users(db),
+        lambda user: schemas.UserResponse.from_orm_fast(user).model_dump()
+    )
 
 # NEW: Get user by email
 @app.get("/users/{email}", response_model=schemas.UserWithSkillsResponse)
 def get_user_by_email_endpoint(email: str, db: Session = Depends(get_db)):
-    user = crud.get_user_skills_by_email(db, email)
-    if not user:
+    profile = crud.get_user_profile_by_email(db, email)
+    if not profile:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    # response_model stays for the docs; the dict is already in its shape, so
+    # return it without FastAPI's own validate + jsonable_encoder pass
+    return ORJSONResponse(profile)
 
 # UPDATED: Skill endpoints using email
 @app.post("/users/{email}/skills/offer")
@@ -222,7 +378,7 @@ def add_skill_offer(
     result = crud.add_skill_offer_by_email(db, email, skill)
     if not result:
         raise HTTPException(status_code=404, detail="User not found")
-    return {"message": "Skill added successfully", "skill": result}
+    return {"message": "Skill added successfully", "skill": column_dict(result)}
 
 @app.post("/users/{email}/skills/request")
 def add_skill_request(
@@ -233,21 +389,36 @@ def add_skill_request(
     result = crud.add_skill_request_by_email(db, email, skill_request)
     if not result:
         raise HTTPException(status_code=404, detail="User not found")
-    return {"message": "Skill request added successfully", "request": result}
+    return {"message": "Skill request added successfully", "request": column_dict(result)}
+
+def skill_page(rows, limit: int):
+    """Page body for the skill listings; next_after is the cursor for the
+    following page, or None once the last page has been returned"""
+    return ORJSONResponse({
+        "items": [row._asdict() for row in rows],
+        "next_after": rows[-1].id if len(rows) == limit else None
+    })
 
 @app.get("/skills/offers")
-def get_all_skill_offers(db: Session = Depends(get_db)):
-    return crud.get_skill_offers(db)
+def get_all_skill_offers(
+    after: int = 0,
+    limit: int = Query(100, ge=1, le=SKILL_PAGE_MAX),
+    db: Session = Depends(get_db)
+):
+    return skill_page(crud.get_skill_offers(db, after, limit), limit)
 
 @app.get("/skills/requests")
-def get_all_skill_requests(db: Session = Depends(get_db)):
-    return crud.get_skill_requests(db)
+def get_all_skill_requests(
+    after: int = 0,
+    limit: int = Query(100, ge=1, le=SKILL_PAGE_MAX),
+    db: Session = Depends(get_db)
+):
+    return skill_page(crud.get_skill_requests(db, after, limit), limit)
 
 # UPDATED: Matching endpoint using email
 @app.get("/users/{email}/matches")
 def get_user_matches(email: str, db: Session = Depends(get_db)):
-    matches = crud.find_matches_by_email(db, email)
-    user = crud.get_user_by_email(db, email)
+    user, matches = crud.find_matches_by_email(db, email)
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -261,12 +432,14 @@ def get_user_matches(email: str, db: Session = Depends(get_db)):
 
 # Password verification (keep this)
 @app.post("/verify-password")
-def verify_user_password(email: str, password: str, db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, email)
+async def verify_user_password(email: str, password: str, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(crud.get_user_by_email, db, email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    is_valid = verify_password(password, user.password)
+    is_valid, new_hash = await verify_and_update_password_async(password, user.password)
+    if new_hash:
+        await run_in_threadpool(crud.update_user_password, db, user.id, new_hash)
     return {"password_correct": is_valid}
 
 # NEW: Get user's own skills
@@ -296,7 +469,10 @@ def send_message_endpoint(
     message: schemas.MessageCreate,
     db: Session = Depends(get_db)
 ):
-    result = crud.send_message(db, sender_email, message)
+    sender_id = crud.get_user_id_from_email(db, sender_email)
+    if sender_id is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    result = crud.send_message(db, sender_id, message)
     if not result:
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": "Message sent successfully", "message_id": result.id}
@@ -304,10 +480,19 @@ def send_message_endpoint(
 @app.get("/messages/{user_email}")
 def get_messages_endpoint(
     user_email: str,
+    limit: Optional[int] = None,
+    offset: int = 0,
     db: Session = Depends(get_db)
 ):
-    messages = crud.get_user_messages(db, user_email)
-    return messages
+    messages = crud.get_user_messages(db, user_email, limit=limit, offset=offset)
+    # MessageRow is a dataclass with a datetime, both native to orjson
+    return stream_json_list(messages, to_json=None)
+
+@app.get("/messages/conversations/{user_email}")
+def get_conversation_list_endpoint(user_email: str, db: Session = Depends(get_db)):
+    conversations = crud.get_conversation_list(db, user_email)
+    # ConversationResponse is a slotted dataclass, which orjson encodes directly
+    return ORJSONResponse(conversations)
 
 @app.get("/messages/conversation/{user1_email}/{user2_email}")
 def get_conversation_endpoint(
@@ -316,7 +501,8 @@ def get_conversation_endpoint(
     db: Session = Depends(get_db)
 ):
     conversation = crud.get_conversation(db, user1_email, user2_email)
-    return conversation
+    # orjson encodes the MessageRow dataclasses directly, skipping jsonable_encoder
+    return ORJSONResponse(conversation)
 
 @app.post("/messages/mark-read/{user_email}/{other_user_email}")
 def mark_messages_read_endpoint(
@@ -335,6 +521,13 @@ def get_unread_count_endpoint(
     count = crud.get_unread_count(db, user_email)
     return {"unread_count": count}
 
+@app.get("/messages/has-unread/{user_email}")
+def has_unread_endpoint(
+    user_email: str,
+    db: Session = Depends(get_db)
+):
+    return {"has_unread": crud.has_unread(db, user_email)}
+
 
 @app.post("/video/create", response_model=schemas.VideoSessionResponse)
 def create_video_session_endpoint(
@@ -344,13 +537,15 @@ def create_video_session_endpoint(
     """Create a new video session room using JSON Body data"""
     # Pass the whole session_data object to crud
     session = crud.create_video_session(db, session_data)
-    return session
+    # Wake the callee's event stream (we're on a worker thread, the events live on the loop)
+    from_thread.run_sync(notify_call_listeners, session.user2_email)
+    return ORJSONResponse(schemas.VideoSessionResponse.from_orm_fast(session).model_dump())
 
 @app.get("/video/sessions/{email}")
 def get_user_video_sessions(email: str, db: Session = Depends(get_db)):
     """Get all video sessions for a user"""
     sessions = crud.get_video_sessions_by_user(db, email)
-    return sessions
+    return ORJSONResponse([session._asdict() for session in sessions])
 
 @app.post("/video/update-status/{room_id}")
 def update_session_status(
@@ -367,37 +562,44 @@ def update_session_status(
 @app.get("/video/room/{room_id}")
 def get_video_room_info(room_id: str, db: Session = Depends(get_db)):
     """Get information about a video room"""
-    session = db.query(models.VideoSession).filter(
-        models.VideoSession.room_id == room_id
+    # Plain column select - only these fields are returned, no ORM object needed
+    session = db.execute(
+        select(
+            models.VideoSession.room_id,
+            models.VideoSession.user1_email,
+            models.VideoSession.user2_email,
+            models.VideoSession.meeting_url,
+            models.VideoSession.status,
+            models.VideoSession.created_at
+        ).where(models.VideoSession.room_id == room_id)
     ).first()
     
     if not session:
         raise HTTPException(status_code=404, detail="Room not found")
     
-    return {
-        "room_id": session.room_id,
-        "user1_email": session.user1_email,
-        "user2_email": session.user2_email,
-        "meeting_url": session.meeting_url,
-        "status": session.status,
-        "created_at": session.created_at
-    }
-@app.post("/video/decline/{room_id}")
-def decline_call_endpoint(room_id: str, db: Session = Depends(get_db)):
-    crud.decline_video_call(db, room_id)
+    return session._asdict()
+@app.post("/video/decline/{room_id}", status_code=202)
+def decline_call_endpoint(room_id: str, background_tasks: BackgroundTasks):
+    # The caller never waits on the result, so write after the response is sent
+    background_tasks.add_task(run_in_new_session, crud.decline_video_call, room_id)
     return {"message": "Call declined"}
 
 @app.post("/users/{email}/update")
 def update_profile(email: str, name: str = Form(...), about: str = Form(None), 
                    linkedin: str = Form(None), github: str = Form(None), twitter: str = Form(None),
                    db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if not user: raise HTTPException(status_code=404)
-    user.name = name
-    user.about = about
-    user.linkedin_url = linkedin
-    user.github_url = github
-    user.twitter_url = twitter
+    # One UPDATE instead of loading the row and flushing the changed attributes.
+    # Nothing in this request reads the User back, so skip syncing the session.
+    result = db.execute(
+        update(models.User).where(models.User.email == schemas.normalize_email(email)).values(
+            name=name,
+            about=about,
+            linkedin_url=linkedin,
+            github_url=github,
+            twitter_url=twitter
+        ).execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0: raise HTTPException(status_code=404)
     db.commit()
     return RedirectResponse(f"/profile-page?email={email}", status_code=303)
 
@@ -423,9 +625,10 @@ def view_public_profile(request: Request, view_email: str, email: Optional[str]
 def feed_page(request: Request, email: str):
     return templates.TemplateResponse("feed.html", {"request": request, "email": email})
 
-@app.get("/api/posts", response_model=List[schemas.PostResponse])
-def get_all_posts(db: Session = Depends(get_db)):
-    return crud.get_posts(db)
+@app.get("/api/posts", responses={200: {"model": List[schemas.PostResponse]}})
+def get_all_posts(request: Request, db: Session = Depends(get_db)):
+    # Always revalidate so a freshly created post shows up right after the redirect
+    return etag_response(request, crud.get_posts_version(db), lambda: schemas.POST_LIST_ADAPTER.dump_python(crud.get_posts(db)))
 
 @app.post("/create-post")
 def create_post_route(
@@ -434,7 +637,9 @@ def create_post_route(
     category: str = Form(...),
     db: Session = Depends(get_db)
 ):
-    post_data = schemas.PostCreate(content=content, category=category)
+    post_data = schemas.POST_CREATE_ADAPTER.validate_python(
+        {"content": content, "category": category}
+    )
     crud.create_post(db, email, post_data)
     return RedirectResponse(f"/feed-page?email={email}", status_code=303)
 
@@ -445,14 +650,17 @@ def groups_page(request: Request, email: str):
     return templates.TemplateResponse("groups.html", {"request": request, "email": email})
 
 @app.get("/api/groups")
-def get_groups(db: Session = Depends(get_db)):
-    return crud.get_all_groups(db)
+def get_groups(request: Request, db: Session = Depends(get_db)):
+    return etag_response(
+        request, crud.get_groups_version(db), lambda: schemas.GROUP_LIST_ADAPTER.dump_python(
+            [schemas.GroupChatResponse.from_orm_fast(group) for group in crud.get_all_groups(db)]
+        ), max_age=60
+    )
 
 @app.get("/api/groups/{group_id}/messages")
 def get_group_chat_messages(group_id: int, db: Session = Depends(get_db)):
-    messages = crud.get_group_messages(db, group_id)
-    # Ensure we return a list, even if it's empty
-    return messages if messages else []
+    # GroupMessageRow dataclasses go straight to orjson
+    return ORJSONResponse(crud.get_group_messages(db, group_id))
 
 @app.post("/api/groups/{group_id}/send")
 def send_group_message(
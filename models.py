@@ -1,16 +1,48 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index, Boolean, SmallInteger, CheckConstraint
+from sqlalchemy.types import TypeDecorator
 from database import Base
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from datetime import datetime
+from enum import IntEnum
+
+# Longest address SMTP allows (RFC 5321); shared by every email column
+EMAIL_LENGTH = 254
+
+class SkillLevel(IntEnum):
+    BEGINNER = 0
+    INTERMEDIATE = 1
+    EXPERT = 2
+
+class SkillLevelType(TypeDecorator):
+    """Stores a skill level as a small int, but reads and writes the
+    lowercase names ("beginner", ...) the API and templates use"""
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return SkillLevel[value.upper()]
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        # A text column (one not yet migrated by db_setup) hands back digit
+        # strings for new rows and the names for rows written before
+        if isinstance(value, str):
+            if not value.isdigit():
+                return value
+            value = int(value)
+        return SkillLevel(value).name.lower()
 
 class User(Base):
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    name = Column(String)
-    email = Column(String, unique=True, index=True)
-    password = Column(String)  
+    name = Column(String(80))
+    email = Column(String(EMAIL_LENGTH), unique=True, index=True)
+    password = Column(String(255))  # argon2 encoded hashes run ~100 chars
     # New fields
     profile_photo = Column(String, nullable=True) # URL or path
     about = Column(Text, nullable=True)
@@ -21,12 +53,17 @@ class User(Base):
     skills_offered = relationship("UserSkill", back_populates="user", cascade="all, delete-orphan")
     skills_needed = relationship("SkillRequest", back_populates="user", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # schemas.Email lowercases on the way in; keep anything else out
+        CheckConstraint("email = lower(email)", name="ck_users_email_lower"),
+    )
+
 class UserSkill(Base):
     __tablename__ = "user_skills"
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    skill_name = Column(String, index=True)
-    skill_level = Column(String)  # beginner, intermediate, expert
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)  # Matcher and profile filter on it
+    skill_name = Column(String(80), index=True)
+    skill_level = Column(SkillLevelType)  # beginner, intermediate, expert
     category_id = Column(Integer, ForeignKey("categories.id"))
     
     user = relationship("User", back_populates="skills_offered")
@@ -35,8 +72,8 @@ class UserSkill(Base):
 class SkillRequest(Base):
     __tablename__ = "skill_requests" 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    skill_name = Column(String, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)  # Matcher and profile filter on it
+    skill_name = Column(String(80), index=True)
     description = Column(Text)  # What they want to learn
     
     user = relationship("User", back_populates="skills_needed")
@@ -50,26 +87,45 @@ class Message(Base):
     receiver_id = Column(Integer, ForeignKey("users.id"))
     content = Column(Text)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
-    is_read = Column(Integer, default=0)  # 0 = unread, 1 = read
+    is_read = Column(Boolean, default=False, nullable=False)  # SQLite stores it as 0/1, same as before
     
     # Relationships
     sender = relationship("User", foreign_keys=[sender_id])
     receiver = relationship("User", foreign_keys=[receiver_id])
 
+    __table_args__ = (
+        # No index here is a prefix of another; each is the plan for the queries listed
+        # Mark-as-read UPDATE, and the received half of message and inbox listings
+        Index("ix_msg_recv_send_read", "receiver_id", "sender_id", "is_read"),
+        # Unread count / has-unread; timestamp lets "newest unread" read in order
+        Index("ix_msg_receiver_unread_ts", "receiver_id", "is_read", "timestamp"),
+        # Conversations, and the sent half of message and inbox listings
+        Index("ix_msg_pair_ts", "sender_id", "receiver_id", "timestamp"),
+    )
+
 class VideoSession(Base):
     __tablename__ = "video_sessions"
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    room_id = Column(String, unique=True, index=True)
-    user1_email = Column(String, index=True)
-    user2_email = Column(String, index=True)
-    meeting_url = Column(String)
-    status = Column(String, default="created")  # created, active, ended
+    room_id = Column(String(64), unique=True, index=True)
+    user1_email = Column(String(EMAIL_LENGTH), index=True)
+    user2_email = Column(String(EMAIL_LENGTH), index=True)
+    meeting_url = Column(String(255))
+    status = Column(String(16), default="created")  # created, active, ended
     created_at = Column(DateTime, default=datetime.utcnow)
     started_at = Column(DateTime, nullable=True)
     ended_at = Column(DateTime, nullable=True)
     duration_seconds = Column(Integer, nullable=True)
 
+    __table_args__ = (
+        # Incoming-call polling looks up a callee's ringing calls, newest first.
+        # Partial index over status = 'created' only; rows drop out once
+        # answered, declined or ended, so it stays tiny regardless of history
+        Index("ix_active_incoming", "user2_email", "created_at",
+              sqlite_where=text("status = 'created'"),
+              postgresql_where=text("status = 'created'")),
+    )
+
 class Category(Base):
     __tablename__ = "categories"
     id = Column(Integer, primary_key=True, index=True)
@@ -88,7 +144,7 @@ class Post(Base):
 class GroupChat(Base):
     __tablename__ = "group_chats"
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String)
+    name = Column(String, unique=True)
     description = Column(String)
 
 class GroupMessage(Base):
@@ -108,4 +164,16 @@ class Booking(Base):
     session_date = Column(String)  # Format: YYYY-MM-DD
     session_time = Column(String)  # Format: HH:MM
     status = Column(String, default="pending") # pending, accepted, declined
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Dashboard lists bookings for either side of the session by date
+        Index("ix_bookings_teacher_status", "teacher_email", "status"),
+        Index("ix_bookings_learner_date", "learner_email", "session_date"),
+    )
+
+class SchemaMigration(Base):
+    """Data migrations db_setup has already applied to this database"""
+    __tablename__ = "schema_migrations"
+    name = Column(String(100), primary_key=True)
+    applied_at = Column(DateTime, server_default=func.now())
@@ -1,48 +1,58 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import AfterValidator, BaseModel, ConfigDict, TypeAdapter
+from typing import Annotated, List, Literal, Optional
 from datetime import datetime
+from dataclasses import dataclass
+# Base for response schemas filled from database rows
+class ORMResponse(BaseModel):
+    # Lets FastAPI's response_model read SQLAlchemy objects too
+    model_config = ConfigDict(from_attributes=True)
+
+    @classmethod
+    def from_orm_fast(cls, obj):
+        """Build from a trusted ORM object by plain attribute access,
+        skipping validation; inbound *Create models still validate"""
+        return cls.model_construct(**{name: getattr(obj, name) for name in cls.model_fields})
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+# Emails are stored lowercased, so lookups hit the unique index exactly
+Email = Annotated[str, AfterValidator(normalize_email)]
+
 # This defines what data we expect when creating a user
 class UserCreate(BaseModel):
     name: str
-    email: str  # We'll upgrade to EmailStr later
+    email: Email  # We'll upgrade to EmailStr later
     password: str  # NEW: Password field
 
 # This defines what data we return when getting a user  
-class UserResponse(BaseModel):
+class UserResponse(ORMResponse):
     id: int
     name: str
     email: str
     # NOTE: We don't include password in response for security!
 
-
-    class Config:
-        from_attributes = True  # This allows converting SQLAlchemy models to Pydantic models
-
 # NEW: Skill schemas
+SkillLevelName = Literal["beginner", "intermediate", "expert"]
+
 class SkillOfferCreate(BaseModel):
     skill_name: str
-    skill_level: str = "intermediate"  # default value
+    skill_level: SkillLevelName = "intermediate"  # default value
 
 class SkillRequestCreate(BaseModel):
     skill_name: str
     description: Optional[str] = None
 
-class SkillOfferResponse(BaseModel):
+class SkillOfferResponse(ORMResponse):
     id: int
     skill_name: str
-    skill_level: str
+    skill_level: Optional[str]  # NULL for levels cleared by the skill_level migration
 
-    class Config:
-        from_attributes = True
-
-class SkillRequestResponse(BaseModel):
+class SkillRequestResponse(ORMResponse):
     id: int
     skill_name: str
     description: Optional[str] = None
 
-    class Config:
-        from_attributes = True
-
 # Extended user response with skills
 class UserUpdate(BaseModel):
     name: Optional[str] = None
@@ -50,7 +60,7 @@ class UserUpdate(BaseModel):
     linkedin_url: Optional[str] = None
     github_url: Optional[str] = None
     twitter_url: Optional[str] = None
-class UserWithSkillsResponse(BaseModel):
+class UserWithSkillsResponse(ORMResponse):
     id: int
     name: str
     email: str
@@ -62,14 +72,26 @@ class UserWithSkillsResponse(BaseModel):
     skills_offered: List[SkillOfferResponse] = []
     skills_needed: List[SkillRequestResponse] = []
 
-    class Config:
-        from_attributes = True
-
 class MessageCreate(BaseModel):
-    receiver_email: str
+    receiver_email: Email
     content: str
 
-class MessageResponse(BaseModel):
+# Plain row type for message listings - built straight from column tuples,
+# so it skips Pydantic validation and per-row dict allocation
+@dataclass(slots=True)
+class MessageRow:
+    id: int
+    sender_id: int
+    sender_email: Optional[str]
+    sender_name: Optional[str]
+    receiver_id: int
+    receiver_email: Optional[str]
+    receiver_name: Optional[str]
+    content: str
+    timestamp: datetime
+    is_read: bool
+
+class MessageResponse(ORMResponse):
     id: int
     sender_name: str
     sender_email: str
@@ -78,11 +100,10 @@ class MessageResponse(BaseModel):
     content: str
     timestamp: datetime
     is_read: bool
-    
-    class Config:
-        from_attributes = True
 
-class ConversationResponse(BaseModel):
+# Output-only inbox row; column order matches crud.get_conversation_list
+@dataclass(slots=True)
+class ConversationResponse:
     other_user_name: str
     other_user_email: str
     last_message: Optional[str]
@@ -93,10 +114,10 @@ class ConversationResponse(BaseModel):
 
 
 class VideoSessionCreate(BaseModel):
-    user1_email: str
-    user2_email: str
+    user1_email: Email
+    user2_email: Email
 
-class VideoSessionResponse(BaseModel):
+class VideoSessionResponse(ORMResponse):
     id: int
     room_id: str
     user1_email: str
@@ -110,33 +131,43 @@ class PostCreate(BaseModel):
     content: str
     category: str
 
-class PostResponse(BaseModel):
+class PostResponse(ORMResponse):
     id: int
     author_email: str
     content: str
     category: str
     created_at: datetime
 
-    class Config:
-        from_attributes = True
-
 # Group Chat Schemas
 class GroupMessageCreate(BaseModel):
     content: str
 
-class GroupMessageResponse(BaseModel):
+# Output-only row for group chat history, built from column tuples like MessageRow
+@dataclass(slots=True)
+class GroupMessageRow:
     id: int
+    group_id: int
     sender_email: str
     content: str
     timestamp: datetime
 
-    class Config:
-        from_attributes = True
+class GroupMessageResponse(ORMResponse):
+    id: int
+    sender_email: str
+    content: str
+    timestamp: datetime
 
-class GroupChatResponse(BaseModel):
+class GroupChatResponse(ORMResponse):
     id: int
     name: str
     description: str
-    
-    class Config:
-        from_attributes = True
\ No newline at end of file
+
+# Prebuilt validators for the form endpoints, built once at import
+# instead of going through the model constructor on every request
+USER_CREATE_ADAPTER = TypeAdapter(UserCreate)
+POST_CREATE_ADAPTER = TypeAdapter(PostCreate)
+
+# List serializers for the ETag'd listings, so a page of models is dumped in
+# one pydantic-core call instead of jsonable_encoder walking each object
+POST_LIST_ADAPTER = TypeAdapter(List[PostResponse])
+GROUP_LIST_ADAPTER = TypeAdapter(List[GroupChatResponse])